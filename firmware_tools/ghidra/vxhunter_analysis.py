@@ -410,6 +410,8 @@ class VxAnalyzer(object):
         print('{}\r\n'.format("-" * 60))
 
     def start_analyzer(self):
+        # Drop symbols cached by a previous run in the same interpreter
+        clear_symbol_cache()
         self.timer.reset()
         self.analyze_bss()
         timer_log = "analyze bss takes {:.3f} seconds".format(self.timer.get_timer())
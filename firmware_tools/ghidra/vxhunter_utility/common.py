@@ -35,8 +35,10 @@ if debug:
 endian = currentProgram.domainFile.getMetadata()[u'Endian']
 if endian == u'Big':
     is_big_endian = True
+    struct_endian = '>'
 else:
     is_big_endian = False
+    struct_endian = '<'
 
 process_type = currentProgram.domainFile.getMetadata()[u'Processor']
 if process_type.endswith(u'64'):
@@ -68,12 +70,23 @@ class Timer(object):
 
 
 def is_address_in_current_program(address):
+    address_offset = address.getOffset()
     for block in currentProgram.memory.blocks:
-        if block.getStart().offset <= address.offset <= block.getEnd().offset:
+        if block.getStart().getOffset() <= address_offset <= block.getEnd().getOffset():
             return True
     return False
 
 
+def get_bytes_data(address, length):
+    """ Read memory data with a single call, instead of one getInt/getByte call per field.
+
+    :param address: start address of data.
+    :param length: data length.
+    :return: data string which can be unpacked with struct.
+    """
+    return getBytes(address, length).tostring()
+
+
 def get_signed_value(input_data):
     pack_format = ""
     if is_big_endian:
@@ -1,15 +1,17 @@
 # coding=utf-8
-import string
+import logging
 import struct
 import sys
+from collections import OrderedDict
+from functools import wraps
 # Handle Java Exception
 import java.lang.Exception
 # Constants from common
-from common import can_demangle
+from common import can_demangle, struct_endian
 # Objects from common
 from common import demangler, DemangledException
 # Functions from common
-from common import is_address_in_current_program
+from common import is_address_in_current_program, get_bytes_data
 from common import get_logger
 
 from ghidra.program.model.util import CodeUnitInsertionException
@@ -27,10 +29,29 @@ function_name_key_words = ['bzero', 'usrInit', 'bfill']
 
 need_create_function = [0x04, 0x05]
 
+user_defined_source = SourceType.USER_DEFINED
+
+# VxWorks symbol in table layouts, same as vx_5_symtbl_dt and vx_6_symtbl_dt:
+# symHashNode, symNamePtr, symPrt, (symRef,) symGroup, symType, End
+vx_5_symbol_struct = struct.Struct(struct_endian + 'IIIhbB')
+vx_6_symbol_struct = struct.Struct(struct_endian + 'IIIIhbB')
+
+# Offsets of VxWorks 5.x windTcb fields: name, entry, pStackBase, pStackLimit, pStackEnd
+vx_5_tcb_field_offsets = (0x34, 0x74, 0x78, 0x7c, 0x80)
+
+# Found symbols and functions cache, keyed by (name, prefix). Symbols and functions are still created
+# during analysis, so names which are not found aren't cached.
+symbol_cache = {}
+function_cache = {}
+
+# Demangle results cache size, symbol strings repeat heavily across large images.
+demangled_symbol_cache_size = 4096
+demangle_function_cache_size = 8192
+_cache_miss = object()
+
 # Prepare VxWorks symbol types
 
-function_name_chaset = string.letters
-function_name_chaset += string.digits
+function_name_chaset = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
 function_name_chaset += "_:.<>,*"  # For C++
 function_name_chaset += "()~+-=/%"  # For C++ special eg operator+(ZafBignumData const &,long)
 ghidra_builtin_types = [
@@ -96,6 +117,37 @@ ghidra_builtin_types = [
     'word'
 ]
 
+function_name_chaset_set = frozenset(function_name_chaset)
+ghidra_builtin_types_set = frozenset(ghidra_builtin_types)
+ghidra_builtin_types_max_length = max(len(builtin_type) for builtin_type in ghidra_builtin_types)
+
+
+def lru_cache(max_size):
+    """ Memoize a single argument function with a bounded LRU cache, functools.lru_cache isn't available in Jython.
+
+    :param max_size: max cache entries.
+    :return: decorator, the cache of decorated function is available as its cache attribute.
+    """
+    def decorator(func):
+        cache = OrderedDict()
+
+        @wraps(func)
+        def wrapper(key):
+            value = cache.pop(key, _cache_miss)
+            if value is _cache_miss:
+                value = func(key)
+                if len(cache) >= max_size:
+                    # Evict the least recently used one
+                    cache.popitem(last=False)
+
+            cache[key] = value
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
 
 def check_is_func_name(function_name):
     """ Check target string is match function name format.
@@ -107,17 +159,78 @@ def check_is_func_name(function_name):
     if len(function_name) > 512:
         return False
 
-    for c in function_name:
-        if (c in function_name_chaset) is False:
-            return False
+    # most of the rejected strings start with an invalid char, eg "(" or " "
+    if function_name and function_name[0] not in function_name_chaset_set:
+        return False
+
+    if not function_name_chaset_set.issuperset(function_name):
+        return False
 
-    if function_name.lower() in ghidra_builtin_types:
+    # skip lowering long names which can't be a builtin type
+    if len(function_name) <= ghidra_builtin_types_max_length and function_name.lower() in ghidra_builtin_types_set:
         return False
 
     return True
 
 
+@lru_cache(demangle_function_cache_size)
 def demangle_function(demangle_string):
+    """ Split demangled string to function return, function name and function parameters.
+
+    :param demangle_string: demangled symbol string, eg "void * operator.new(unsigned int,void *)".
+    :return: tuple of (function_return, function_name, function_parameters).
+    """
+    function_name = None
+    function_return = None
+    function_name_end = len(demangle_string) - 1
+
+    # get parameters
+    if demangle_string.endswith(')'):
+        # have parameters
+        index = function_name_end
+        parentheses_count = 0
+        while index >= 0:
+            if demangle_string[index] == ')':
+                parentheses_count += 1
+
+            elif demangle_string[index] == '(':
+                parentheses_count -= 1
+
+            index -= 1
+
+            if parentheses_count == 0:
+                break
+
+        function_name_end = index
+
+    if function_name_end < 0 or demangle_string.startswith(' '):
+        return scan_demangle_function(demangle_string)
+
+    # split function return and function name at the last space
+    function_return, separator, temp_data = demangle_string[:function_name_end + 1].rpartition(' ')
+    if not separator:
+        function_return = None
+
+    elif temp_data != "*" and check_is_func_name(temp_data):
+        function_name = temp_data
+        function_parameters = demangle_string[function_name_end + 1:]
+        return function_return, function_name, function_parameters
+
+    else:
+        # last part is not a function name, eg "operator *(void)", so use the part before the first space
+        function_name_end = demangle_string.find(' ')
+        temp_data = demangle_string[:function_name_end]
+        function_return = None
+
+    if check_is_func_name(temp_data):
+        function_name = temp_data
+
+    function_parameters = demangle_string[function_name_end + 1:]
+    return function_return, function_name, function_parameters
+
+
+def scan_demangle_function(demangle_string):
+    """ Split demangled string by scanning it backward char by char, used for corner cases. """
     function_name = None
     function_return = None
     function_parameters = None
@@ -181,64 +294,78 @@ def demangle_function(demangle_string):
 
 
 def demangled_symbol(symbol_string):
-    sym_demangled_name = None
-    sym_demangled = None
-    if can_demangle:
-        try:
-            sym_demangled = demangler.demangle(symbol_string, True)
-
-            if not sym_demangled:
-                # some mangled function name didn't start with mangled prefix
-                sym_demangled = demangler.demangle(symbol_string, False)
+    # Plain C symbols can't be demangled, mangled names start with _ or ? or have a "__" for gcc 2.x style.
+    # Check them before the cache, so only mangling candidates are cached.
+    if not symbol_string or (symbol_string[0] not in '_?' and '__' not in symbol_string):
+        return None
 
-        except DemangledException as err:
-            logger.debug("First pass demangling failed: symbol_string: {}, reason: {}".format(symbol_string, err))
-            pass
+    return demangle_symbol_string(symbol_string)
 
-        except java.lang.Exception as err:
-            logger.debug("demangling failed: symbol_string: {}, reason: {}".format(symbol_string, err))
 
-        if not sym_demangled:
+# Failed demangle results are cached too, so they won't be retried.
+@lru_cache(demangled_symbol_cache_size)
+def demangle_symbol_string(symbol_string):
+    is_debug = logger.isEnabledFor(logging.DEBUG)
+    sym_demangled_name = None
+    sym_demangled = None
+    if can_demangle:
+        # Demangle without demangleOnlyKnownPatterns also handles the known patterns, so one pass is enough for
+        # each candidate. Some mangled function name didn't start with mangled prefix but with a _ prefix, which
+        # should be removed before demangle.
+        demangle_strings = [symbol_string]
+        if symbol_string.startswith('_'):
+            demangle_strings.append(symbol_string[1:])
+
+        for demangle_string in demangle_strings:
             try:
-                # Temp fix to handle _ prefix function name by remove _ prefix before demangle
-                sym_demangled = demangler.demangle(symbol_string[1:], False)
+                sym_demangled = demangler.demangle(demangle_string, False)
 
             except DemangledException as err:
-                logger.debug("Second pass demangling failed: symbol_string: {}, reason:{}".format(symbol_string, err))
-                pass
+                if is_debug:
+                    logger.debug("Demangling failed: demangle_string: {}, reason: {}".format(demangle_string, err))
 
             except java.lang.Exception as err:
-                logger.debug("demangling failed: symbol_string: {}, reason: {}".format(symbol_string, err))
+                if is_debug:
+                    logger.debug("demangling failed: demangle_string: {}, reason: {}".format(demangle_string, err))
+
+            if sym_demangled:
+                break
 
         if sym_demangled:
             sym_demangled_name = sym_demangled.getSignature(False)
 
-            if sym_demangled_name:
-                logger.debug("sym_demangled_name: {}".format(sym_demangled_name))
-            else:
-                logger.debug("Demangled symbol name for string {} is None.".format(symbol_string))
+            if is_debug:
+                if sym_demangled_name:
+                    logger.debug("sym_demangled_name: {}".format(sym_demangled_name))
+                else:
+                    logger.debug("Demangled symbol name for string {} is None.".format(symbol_string))
 
     return sym_demangled_name
 
 
 def add_symbol(symbol_name, symbol_name_address, symbol_address, symbol_type):
+    # Skip formatting debug messages in this hot path if they would be dropped anyway
+    is_debug = logger.isEnabledFor(logging.DEBUG)
     symbol_address = toAddr(symbol_address)
     symbol_name_string = symbol_name
     # Get symbol_name
     if symbol_name_address:
         symbol_name_address = toAddr(symbol_name_address)
-        logger.debug("Have symbol name {} at address {}.".format(symbol_name_string, symbol_name_address))
+        if is_debug:
+            logger.debug("Have symbol name {} at address {}.".format(symbol_name_string, symbol_name_address))
 
         if getDataAt(symbol_name_address):
-            logger.debug("Data detected at {}; removing to make room for symbol {}".format(symbol_name_address, symbol_name))
+            if is_debug:
+                logger.debug("Data detected at {}; removing to make room for symbol {}".format(symbol_name_address, symbol_name))
             removeDataAt(symbol_name_address)
-        else:
+        elif is_debug:
             logger.debug("No data detected at {}. Moving on...".format(symbol_address))
 
 
         try:
             symbol_name_string = createAsciiString(symbol_name_address).getValue()
-            logger.debug("Created ascii string {} at {}.".format(symbol_name_string, symbol_name_address))
+            if is_debug:
+                logger.debug("Created ascii string {} at {}.".format(symbol_name_string, symbol_name_address))
         except CodeUnitInsertionException as err:
             logger.error("Failed to create ascii string for symbol named {} at {}: {}".format(symbol_name, symbol_name_address, err))
         except BaseException as err:
@@ -247,9 +374,10 @@ def add_symbol(symbol_name, symbol_name_address, symbol_address, symbol_type):
 
 
     if getInstructionAt(symbol_address):
-        logger.debug("Instruction detected at {}; removing to make room for symbol {}".format(symbol_address, symbol_name))
+        if is_debug:
+            logger.debug("Instruction detected at {}; removing to make room for symbol {}".format(symbol_address, symbol_name))
         removeInstructionAt(symbol_address)
-    else:
+    elif is_debug:
         logger.debug("No instruction detected at {}. Moving on...".format(symbol_address))
 
     # Demangle symName
@@ -258,44 +386,45 @@ def add_symbol(symbol_name, symbol_name_address, symbol_address, symbol_type):
         sym_demangled_name = demangled_symbol(symbol_name_string)
 
         if symbol_name_string and (symbol_type in need_create_function):
-            logger.debug("Start disassemble function {} at address {}".format(symbol_name_string, symbol_address.toString()))
+            if is_debug:
+                logger.debug("Start disassemble function {} at address {}".format(symbol_name_string, symbol_address.toString()))
             disassemble(symbol_address)
             function = createFunction(symbol_address, symbol_name_string)
             if function:
-                function.setName(symbol_name_string, SourceType.USER_DEFINED)
+                function.setName(symbol_name_string, user_defined_source)
 
             else:
                 # Add original symbol name
                 createLabel(symbol_address, symbol_name_string, True)
 
-            logger.debug("function: {}; sym_demangled_name: {}".format(function, sym_demangled_name))
+            if is_debug:
+                logger.debug("function: {}; sym_demangled_name: {}".format(function, sym_demangled_name))
 
             if function and sym_demangled_name:
                 # Add demangled string to comment
-                codeUnit = listing.getCodeUnitAt(symbol_address)
-                codeUnit.setComment(codeUnit.PLATE_COMMENT, sym_demangled_name)
+                setPlateComment(symbol_address, sym_demangled_name)
                 # Rename function
                 # TODO: demangle_function can probably be replaced. Function objects in the Ghidra API have each
                 # of .getName(), .getParameters, and .getReturn.
                 function_return, function_name, function_parameters = demangle_function(sym_demangled_name)
 
-                logger.debug("Demangled function name is: {}".format(function_name))
-                logger.debug("Demangled function return is: {}".format(function_return))
-                logger.debug("Demangled function parameters is: {}".format(function_parameters))
+                if is_debug:
+                    logger.debug("Demangled function name is: {}".format(function_name))
+                    logger.debug("Demangled function return is: {}".format(function_return))
+                    logger.debug("Demangled function parameters is: {}".format(function_parameters))
 
                 if function_name:
-                    function.setName(function_name, SourceType.USER_DEFINED)
+                    function.setName(function_name, user_defined_source)
                     # TODO: Add parameters later
                 # Add original symbol name
                 createLabel(symbol_address, symbol_name_string, True)
-            if function is None and sym_demangled_name is not None:
+            if is_debug and function is None and sym_demangled_name is not None:
                 logger.debug('Function for symbol {} was None. In createFunction, one or more functions overlapped the specified address set.'.format(sym_demangled_name))
 
         else:
             createLabel(symbol_address, symbol_name_string, True)
             if sym_demangled_name:
-                codeUnit = listing.getCodeUnitAt(symbol_address)
-                codeUnit.setComment(codeUnit.PLATE_COMMENT, sym_demangled_name)
+                setPlateComment(symbol_address, sym_demangled_name)
 
     except Exception as err:
         logger.error("Create symbol failed: symbol_name: {}, symbol_name_address: {}, symbol_address: {}, symbol_type: {} reason: {}".format(symbol_name_string, symbol_name_address, symbol_address, symbol_type, err))
@@ -328,49 +457,107 @@ def is_vx_symbol_file(file_data, is_big_endian=True):
             return False
 
     if is_big_endian:
-        return struct.unpack('>I', file_data[:4])[0] == len(file_data)
+        return struct.unpack_from('>I', file_data, 0)[0] == len(file_data)
 
     else:
-        return struct.unpack('<I', file_data[:4])[0] == len(file_data)
+        return struct.unpack_from('<I', file_data, 0)[0] == len(file_data)
+
+
+def is_cached_object_valid(cached_object, name, prefix):
+    """ Check cached Symbol or Function still exists and still has the looked up name.
+
+    :param cached_object: cached Symbol or Function object.
+    :param name: looked up name.
+    :param prefix: looked up name prefix.
+    :return: True if cached object can be returned, False otherwise.
+    """
+    if cached_object.isDeleted():
+        return False
+
+    object_name = cached_object.getName()
+    return object_name == name or (prefix and object_name == "{}{}".format(prefix, name))
 
 
 def get_symbol(symbol_name, symbom_prefix="_"):
+    cache_key = (symbol_name, symbom_prefix)
+    symbol = symbol_cache.get(cache_key)
+    if symbol:
+        if is_cached_object_valid(symbol, symbol_name, symbom_prefix):
+            return symbol
+
+        del symbol_cache[cache_key]
+
     symbol = getSymbol(symbol_name, currentProgram.getGlobalNamespace())
     if not symbol and symbom_prefix:
         symbol = getSymbol("{}{}".format(symbom_prefix, symbol_name), currentProgram.getGlobalNamespace())
 
+    if symbol:
+        symbol_cache[cache_key] = symbol
     return symbol
 
 
 def get_function(function_name, function_prefix="_"):
+    cache_key = (function_name, function_prefix)
+    function = function_cache.get(cache_key)
+    if function:
+        if is_cached_object_valid(function, function_name, function_prefix):
+            return function
+
+        del function_cache[cache_key]
+
     function = getFunction(function_name)
     if not function and function_prefix:
         function = getFunction("{}{}".format(function_prefix, function_name))
 
+    if function:
+        function_cache[cache_key] = function
     return function
 
 
+def clear_symbol_cache():
+    """ Clear cached get_symbol and get_function results, eg after symbols or functions are removed. """
+    symbol_cache.clear()
+    function_cache.clear()
+
+
 def fix_symbol_by_chains(head, tail, vx_version):
-    symbol_interval = 0x10
+    symbol_struct = vx_5_symbol_struct
     dt = vx_5_symtbl_dt
     if vx_version == 6:
-        symbol_interval = 20
+        symbol_struct = vx_6_symbol_struct
         dt = vx_6_symtbl_dt
+    symbol_interval = symbol_struct.size
+
+    # Read symbols in chain
+    symbols = []
     ea = head
     while True:
-        prev_symbol_addr = toAddr(getInt(ea))
-        symbol_name_address = getInt(ea.add(0x04))
-        symbol_dest_address = getInt(ea.add(0x08))
-        symbol_type = getByte(ea.add(symbol_interval - 2))
-        create_struct(ea, dt)
-        # Using symbol_address as default symbol_name.
-        symbol_name = "0x{:08X}".format(symbol_dest_address)
-        add_symbol(symbol_name, symbol_name_address, symbol_dest_address, symbol_type)
+        symbol_fields = symbol_struct.unpack_from(get_bytes_data(ea, symbol_interval))
+        prev_symbol_ptr, symbol_name_address, symbol_dest_address = symbol_fields[:3]
+        symbol_type = symbol_fields[-2]
+        symbols.append((ea, symbol_name_address, symbol_dest_address, symbol_type))
 
-        if getInt(ea) == 0 or ea == tail:
+        if prev_symbol_ptr == 0 or ea == tail:
             break
 
-        ea = prev_symbol_addr
+        ea = toAddr(prev_symbol_ptr)
+
+    # Create symbol structs, use one array if symbols in chain are contiguous.
+    symbol_offsets = sorted(symbol[0].getOffset() for symbol in symbols)
+    is_contiguous = all(symbol_offsets[i + 1] - symbol_offsets[i] == symbol_interval
+                        for i in range(len(symbol_offsets) - 1))
+    if len(symbols) > 1 and is_contiguous:
+        symbol_array_data_type = ArrayDataType(dt, len(symbols), dt.getLength())
+        create_struct(toAddr(symbol_offsets[0]), symbol_array_data_type)
+
+    else:
+        for symbol in symbols:
+            create_struct(symbol[0], dt)
+
+    for ea, symbol_name_address, symbol_dest_address, symbol_type in symbols:
+        # Using symbol_address as default symbol_name.
+        symbol_name = "0x{:08X}".format(symbol_dest_address)
+        add_symbol(symbol_name, symbol_name_address, symbol_dest_address, symbol_type)
 
     return
 
@@ -382,8 +569,15 @@ def create_struct(data_address, data_struct, overwrite=True):
 
     try:
         if overwrite:
-            for offset in range(data_struct.getLength()):
-                removeDataAt(data_address.add(offset))
+            data_end_address = data_address.add(data_struct.getLength() - 1)
+            # clearListing also clears instructions, don't overwrite code with a struct from a bad pointer.
+            instruction = getInstructionContaining(data_address) or getInstructionAfter(data_address)
+            if instruction and instruction.getMinAddress().compareTo(data_end_address) <= 0:
+                logger.error("Can't create data struct at {:#010x} with type {}, instruction found at {}".format(
+                    data_address.getOffset(), data_struct, instruction.getMinAddress()))
+                return
+
+            clearListing(data_address, data_end_address)
         createData(data_address, data_struct)
 
     except:
@@ -393,7 +587,8 @@ def create_struct(data_address, data_struct, overwrite=True):
 
 def fix_cl_buff_chain(cl_buff_addr, vx_version=5):
     if vx_version == 5:
-        if cl_buff_addr.offset == 0:
+        cl_buff_offset = cl_buff_addr.getOffset()
+        if not cl_buff_offset:
             return
 
         next_cl_buff_addr = cl_buff_addr
@@ -403,14 +598,17 @@ def fix_cl_buff_chain(cl_buff_addr, vx_version=5):
             else:
                 return
 
-            next_cl_buff_addr = toAddr(getInt(next_cl_buff_addr))
-            if next_cl_buff_addr == cl_buff_addr:
+            next_cl_buff_offset = getInt(next_cl_buff_addr) & 0xffffffff
+            if next_cl_buff_offset == cl_buff_offset:
                 return
 
+            next_cl_buff_addr = toAddr(next_cl_buff_offset)
+
 
 def fix_clpool(clpool_addr, vx_version=5):
+    clpool_offset = clpool_addr.getOffset()
     cl_pool_info = {
-        "cl_pool_addr": clpool_addr.getOffset(),
+        "cl_pool_addr": clpool_offset,
         "cl_pool_size": None,
         "cl_pool_num": None,
         "cl_pool_num_free": None,
@@ -419,24 +617,26 @@ def fix_clpool(clpool_addr, vx_version=5):
 
     }
     if vx_version == 5:
-        if clpool_addr.offset == 0:
+        if not clpool_offset:
             return
 
         if is_address_in_current_program(clpool_addr):
             create_struct(clpool_addr, vx_5_clPool)
-            cl_head_addr = toAddr(getInt(clpool_addr.add(0x14)))
-            cl_pool_info["cl_pool_size"] = getInt(clpool_addr.add(0x00))
-            cl_pool_info["cl_pool_num"] = getInt(clpool_addr.add(0x08))
-            cl_pool_info["cl_pool_num_free"] = getInt(clpool_addr.add(0x0c))
-            cl_pool_info["cl_pool_usage"] = getInt(clpool_addr.add(0x10))
-            cl_pool_info["cl_head_addr"] = cl_head_addr.getOffset()
-            fix_cl_buff_chain(cl_head_addr)
+            # clSize, clLg2, clNum, clNumFree, clUsage, pClHead
+            cl_pool_size, _, cl_pool_num, cl_pool_num_free, cl_pool_usage, cl_head_ptr = struct.unpack_from(
+                struct_endian + '5iI', get_bytes_data(clpool_addr, 0x18), 0)
+            cl_pool_info["cl_pool_size"] = cl_pool_size
+            cl_pool_info["cl_pool_num"] = cl_pool_num
+            cl_pool_info["cl_pool_num_free"] = cl_pool_num_free
+            cl_pool_info["cl_pool_usage"] = cl_pool_usage
+            cl_pool_info["cl_head_addr"] = cl_head_ptr
+            fix_cl_buff_chain(toAddr(cl_head_ptr))
             return cl_pool_info
 
 
 def fix_pool_func_tbl(pool_func_addr, vx_version=5):
     if vx_version == 5:
-        if pool_func_addr.offset == 0:
+        if not pool_func_addr.getOffset():
             return
 
         if is_address_in_current_program(pool_func_addr):
@@ -450,7 +650,7 @@ def fix_pool_func_tbl(pool_func_addr, vx_version=5):
                 disassemble(func_addr)
                 function = createFunction(func_addr, func_name)
                 if function:
-                    function.setName(func_name, SourceType.USER_DEFINED)
+                    function.setName(func_name, user_defined_source)
 
                 else:
                     # Add original symbol name
@@ -460,8 +660,9 @@ def fix_pool_func_tbl(pool_func_addr, vx_version=5):
 
 
 def fix_netpool(netpool_addr, vx_version=5):
+    netpool_offset = netpool_addr.getOffset()
     net_pool_info = {
-        "pool_addr": netpool_addr.getOffset(),
+        "pool_addr": netpool_offset,
         "pool_table_addr": None,
         "pool_status_addr": None,
         "pool_func_tbl_addr": None,
@@ -469,25 +670,25 @@ def fix_netpool(netpool_addr, vx_version=5):
     }
     if vx_version == 5:
         create_struct(netpool_addr, vx_5_net_pool)
-        pool_table_addr = netpool_addr.add(0x24)
-        logger.info("Found ClPool table at {:#010x}".format(pool_table_addr.getOffset()))
-        net_pool_info["pool_table_addr"] = pool_table_addr.getOffset()
-        pool_status_addr = toAddr(getInt(netpool_addr.add(0x50)))
-        logger.info("Found PoolStat at {:#010x}".format(pool_status_addr.getOffset()))
-        net_pool_info["pool_status_addr"] = pool_table_addr.getOffset()
-        pool_function_tbl_addr = toAddr(getInt(netpool_addr.add(0x54)))
-        logger.info("Found pFuncTbl at {:#010x}".format(pool_function_tbl_addr.getOffset()))
-        net_pool_info["pool_func_tbl_addr"] = pool_function_tbl_addr.getOffset()
-
-        for i in range(VX_5_CL_TBL_SIZE):
-            offset = i * 0x04
-            cl_pool_addr = toAddr(getInt(pool_table_addr.add(offset)))
+        netpool_data = get_bytes_data(netpool_addr, vx_5_net_pool.getLength())
+        pool_table_offset = netpool_offset + 0x24
+        logger.info("Found ClPool table at {:#010x}".format(pool_table_offset))
+        net_pool_info["pool_table_addr"] = pool_table_offset
+        pool_status_ptr, pool_function_tbl_ptr = struct.unpack_from(struct_endian + 'II', netpool_data, 0x50)
+        logger.info("Found PoolStat at {:#010x}".format(pool_status_ptr))
+        net_pool_info["pool_status_addr"] = pool_status_ptr
+        logger.info("Found pFuncTbl at {:#010x}".format(pool_function_tbl_ptr))
+        net_pool_info["pool_func_tbl_addr"] = pool_function_tbl_ptr
+
+        cl_pool_table = struct.unpack_from(struct_endian + '{}I'.format(VX_5_CL_TBL_SIZE), netpool_data, 0x24)
+        for cl_pool_offset in cl_pool_table:
+            cl_pool_addr = toAddr(cl_pool_offset)
             cl_pool_info = fix_clpool(cl_pool_addr, vx_version)
             if cl_pool_info:
                 net_pool_info["cl_pool_info"].append(cl_pool_info)
 
-        create_struct(pool_status_addr, vx_5_pool_stat)
-        fix_pool_func_tbl(pool_function_tbl_addr, vx_version)
+        create_struct(toAddr(pool_status_ptr), vx_5_pool_stat)
+        fix_pool_func_tbl(toAddr(pool_function_tbl_ptr), vx_version)
 
     return net_pool_info
 
@@ -504,28 +705,22 @@ def fix_tcb(tcb_addr, vx_version=5):
     }
     if vx_version == 5:
         create_struct(tcb_addr, vx_5_wind_tcb)
-        task_name_ptr = tcb_addr.add(0x34)
-        task_name_addr = toAddr(getInt(task_name_ptr))
-        task_name = getDataAt(task_name_addr)
+        tcb_data = get_bytes_data(tcb_addr, vx_5_tcb_field_offsets[-1] + 4)
+        task_name_ptr, task_entry_ptr, task_stack_base, task_stack_limit, task_stack_limit_end = [
+            struct.unpack_from(struct_endian + 'I', tcb_data, offset)[0] for offset in vx_5_tcb_field_offsets
+        ]
+        task_name = getDataAt(toAddr(task_name_ptr))
         logger.info("Task name is {}".format(task_name))
         tcb_info["task_name"] = task_name
-        task_entry_ptr = tcb_addr.add(0x74)
-        task_entry_addr = toAddr(getInt(task_entry_ptr))
-        tcb_info["task_entry_addr"] = task_entry_addr.getOffset()
-        logger.info("Task entry addr is {:#010x}".format(task_entry_addr.getOffset()))
-        task_entry_name = getFunctionAt(task_entry_addr)
+        tcb_info["task_entry_addr"] = task_entry_ptr
+        logger.info("Task entry addr is {:#010x}".format(task_entry_ptr))
+        task_entry_name = getFunctionAt(toAddr(task_entry_ptr))
         tcb_info["task_entry_name"] = task_entry_name
         logger.info("Task entry name is {}".format(task_entry_name))
-        task_stack_base_ptr = tcb_addr.add(0x78)
-        task_stack_base = toAddr(getInt(task_stack_base_ptr))
-        tcb_info["task_stack_base"] = task_stack_base.getOffset()
-        logger.info("Task stack_base is {:#010x}".format(task_stack_base.getOffset()))
-        task_stack_limit_ptr = tcb_addr.add(0x7c)
-        task_stack_limit = toAddr(getInt(task_stack_limit_ptr))
-        tcb_info["task_stack_limit"] = task_stack_limit.getOffset()
-        logger.info("Task stack_limit is {:#010x}".format(task_stack_limit.getOffset()))
-        task_stack_limit_end_ptr = tcb_addr.add(0x80)
-        task_stack_limit_end = toAddr(getInt(task_stack_limit_end_ptr))
-        tcb_info["task_stack_limit_end"] = task_stack_limit_end.getOffset()
-        logger.info("Task stack limit end is {:#010x}".format(task_stack_limit_end.getOffset()))
+        tcb_info["task_stack_base"] = task_stack_base
+        logger.info("Task stack_base is {:#010x}".format(task_stack_base))
+        tcb_info["task_stack_limit"] = task_stack_limit
+        logger.info("Task stack_limit is {:#010x}".format(task_stack_limit))
+        tcb_info["task_stack_limit_end"] = task_stack_limit_end
+        logger.info("Task stack limit end is {:#010x}".format(task_stack_limit_end))
         return tcb_info
@@ -1,8 +1,6 @@
 from common import BaseTestCase, mock
-import string
 
-function_name_chaset = string.letters
-function_name_chaset += string.digits
+function_name_chaset = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
 function_name_chaset += "_:.<>,*"  # For C++
 function_name_chaset += "()~+-=/%"  # For C++ special eg operator+(ZafBignumData const &,long)
 
@@ -70,6 +68,10 @@ ghidra_builtin_types = [
     'word'
 ]
 
+function_name_chaset_set = frozenset(function_name_chaset)
+ghidra_builtin_types_set = frozenset(ghidra_builtin_types)
+ghidra_builtin_types_max_length = max(len(builtin_type) for builtin_type in ghidra_builtin_types)
+
 
 def check_is_func_name(function_name):
     """ Check target string is match function name format.
@@ -81,17 +83,77 @@ def check_is_func_name(function_name):
     if len(function_name) > 512:
         return False
 
-    for c in function_name:
-        if (c in function_name_chaset) is False:
-            return False
+    # most of the rejected strings start with an invalid char, eg "(" or " "
+    if function_name and function_name[0] not in function_name_chaset_set:
+        return False
 
-    if function_name.lower() in ghidra_builtin_types:
+    if not function_name_chaset_set.issuperset(function_name):
+        return False
+
+    # skip lowering long names which can't be a builtin type
+    if len(function_name) <= ghidra_builtin_types_max_length and function_name.lower() in ghidra_builtin_types_set:
         return False
 
     return True
 
 
 def demangle_function(demangle_string):
+    """ Split demangled string to function return, function name and function parameters.
+
+    :param demangle_string: demangled symbol string, eg "void * operator.new(unsigned int,void *)".
+    :return: tuple of (function_return, function_name, function_parameters).
+    """
+    function_name = None
+    function_return = None
+    function_name_end = len(demangle_string) - 1
+
+    # get parameters
+    if demangle_string.endswith(')'):
+        # have parameters
+        index = function_name_end
+        parentheses_count = 0
+        while index >= 0:
+            if demangle_string[index] == ')':
+                parentheses_count += 1
+
+            elif demangle_string[index] == '(':
+                parentheses_count -= 1
+
+            index -= 1
+
+            if parentheses_count == 0:
+                break
+
+        function_name_end = index
+
+    if function_name_end < 0 or demangle_string.startswith(' '):
+        return scan_demangle_function(demangle_string)
+
+    # split function return and function name at the last space
+    function_return, separator, temp_data = demangle_string[:function_name_end + 1].rpartition(' ')
+    if not separator:
+        function_return = None
+
+    elif temp_data != "*" and check_is_func_name(temp_data):
+        function_name = temp_data
+        function_parameters = demangle_string[function_name_end + 1:]
+        return function_return, function_name, function_parameters
+
+    else:
+        # last part is not a function name, eg "operator *(void)", so use the part before the first space
+        function_name_end = demangle_string.find(' ')
+        temp_data = demangle_string[:function_name_end]
+        function_return = None
+
+    if check_is_func_name(temp_data):
+        function_name = temp_data
+
+    function_parameters = demangle_string[function_name_end + 1:]
+    return function_return, function_name, function_parameters
+
+
+def scan_demangle_function(demangle_string):
+    """ Split demangled string by scanning it backward char by char, used for corner cases. """
     function_name = None
     function_return = None
     function_parameters = None
@@ -249,3 +311,10 @@ class VxHunterGhidraUtilityTests(BaseTestCase):
         self.assertEqual(None, function_return)
         self.assertEqual("___tf36CServiceRequestSerialPollActiveState", function_name)
         self.assertEqual("", function_parameters)
+
+    def test_demangle_function_14(self):
+        demangle_sting = "int usrInit"
+        function_return, function_name, function_parameters = demangle_function(demangle_sting)
+        self.assertEqual("int", function_return)
+        self.assertEqual("usrInit", function_name)
+        self.assertEqual("", function_parameters)